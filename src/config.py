@@ -1,19 +1,30 @@
-from pydantic_settings import BaseSettings
-from pydantic import Field, ConfigDict
-import os
+from annotated_types import Ge, Gt, Le
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
+from pydantic import Field, field_validator
+from typing import Annotated, Any, Tuple
+from urllib.parse import quote
 
 class Settings(BaseSettings):
     """
     Application settings using Pydantic BaseSettings.
     Environment variables will be automatically loaded and type-converted.
     """
-    model_config = ConfigDict(extra='ignore')
+    model_config = SettingsConfigDict(
+        env_file='.env',
+        env_file_encoding='utf-8',
+        extra='ignore',
+        frozen=True
+    )
 
     # GitHub Configuration
     github_token: str = Field(
-        default=os.environ.get('GITHUB_TOKEN', ''),
+        default="",
         description="GitHub API token for authentication"
     )
+    github_token_multi_thread: Annotated[Tuple[str, ...], NoDecode] = Field(
+        default=(),
+        description="Comma-separated GitHub API tokens to rotate between threads"
+    )
     github_api_url: str = Field(
         default="https://api.github.com/graphql",
         description="GitHub GraphQL API endpoint"
@@ -33,25 +44,40 @@ class Settings(BaseSettings):
     )
 
     # Test-specific settings
-    batch_size: int = Field(default=5, ge=1, le=100)
-    max_retries: int = Field(default=3, ge=1)
-    total_num_repo: int = Field(default=100, ge=1)
-    default_min_stars: int = Field(default=100, ge=0)
-    default_start_year: int = Field(default=2024, ge=2008, le=2025)
-    default_start_month: int = Field(default=1, ge=1, le=12)
-    default_partition_threshold: int = Field(
-        default=100,
-        gt=0,
-        le=1000
+    batch_size: Annotated[int, Ge(1), Le(100)] = 5
+    max_retries: Annotated[int, Ge(1)] = 3
+    total_num_repo: Annotated[int, Ge(1)] = 100
+    default_min_stars: Annotated[int, Ge(0)] = 100
+    default_start_year: Annotated[int, Ge(2008), Le(2025)] = 2024
+    default_start_month: Annotated[int, Ge(1), Le(12)] = 1
+    default_partition_threshold: Annotated[int, Gt(0), Le(1000)] = 100
+
+    # Always built from the db_* fields, so init_db and the engine agree;
+    # a DATABASE_URL in the environment is deliberately not honoured
+    database_url: str = Field(
+        default="",
+        description="Database URL built from the db_* fields"
     )
 
-    @property
-    def database_url(self) -> str:
-        """Generate the database URL from components"""
-        return (
-            f"postgresql://{self.db_user}:{self.db_password}"
+    @field_validator("github_token_multi_thread", mode="before")
+    @classmethod
+    def split_tokens(cls, v):
+        """Parse the comma-separated token list once, at construction"""
+        if isinstance(v, str):
+            return tuple(t.strip() for t in v.split(",") if t.strip())
+        return v
+
+    def model_post_init(self, __context: Any) -> None:
+        """Generate the database URL from components once, at construction"""
+        # Percent-encode credentials so '@', ':' or '/' cannot corrupt the URL
+        user = quote(self.db_user, safe="")
+        password = quote(self.db_password, safe="")
+        object.__setattr__(
+            self,
+            "database_url",
+            f"postgresql://{user}:{password}"
             f"@{self.db_host}:{self.db_port}/{self.db_name}"
         )
 
 # Initialize settings
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,17 +1,23 @@
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import time
-from datetime import datetime
-import pytz
+from datetime import datetime, timezone
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import cycle
 import argparse
 import calendar
 import logging
-from typing import Dict, Any, List
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, List, Optional
 import threading
 from queue import Queue
 from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from src.models import Repository, get_db
+from src.models import Repository, SessionLocal
 from src.config import settings
 
 # Disable logging from other libraries
@@ -24,20 +30,61 @@ logging.basicConfig(
     format='%(message)s',  # Only show the message without timestamp or level
     force=True  # Override any existing configuration
 )
+logger = logging.getLogger(__name__)
 
 class TokenManager:
     def __init__(self, token):
         """Initialize with a single token or a list of tokens"""
-        self.tokens = [token] if isinstance(token, str) else token
-        self.current_index = 0
+        self.tokens = [token] if isinstance(token, str) else list(token)
+        self._offsets = cycle(range(len(self.tokens)))
+        # token -> (remaining, reset_at, reset epoch seconds); tokens without a
+        # known budget, or whose budget has since reset, count as fresh
+        self._budget = {}
         self.lock = Lock()
         
     def get_token(self):
-        """Get the next token in a thread-safe manner"""
+        """
+        Get the token with the most remaining budget, rotating the starting
+        point so tokens with equal budgets are used round robin
+        """
+        start = next(self._offsets)
+        rotation = self.tokens[start:] + self.tokens[:start]
+        return max(rotation, key=self.get_remaining)
+    
+    def has_budget(self, token):
+        """Whether the token's budget is known and has not reset since"""
+        budget = self._budget.get(token)
+        return budget is not None and budget[2] > time.time()
+    
+    def get_remaining(self, token):
+        """Last known remaining budget of the token"""
+        budget = self._budget.get(token)
+        return budget[0] if self.has_budget(token) else float('inf')
+    
+    def get_reset_at(self, token):
+        """Last known reset time of the token, or None if it is not known"""
+        budget = self._budget.get(token)
+        return budget[1] if self.has_budget(token) else None
+    
+    def update_budget(self, token, remaining, reset_at):
+        """Record the rate limit GitHub reported for the token"""
+        reset_ts = parse_github_timestamp(reset_at).replace(tzinfo=timezone.utc).timestamp()
+        with self.lock:
+            self._budget[token] = (remaining, reset_at, reset_ts)
+    
+    def spend(self, token, points):
+        """Deduct estimated points from the token's known budget"""
         with self.lock:
-            token = self.tokens[self.current_index]
-            self.current_index = (self.current_index + 1) % len(self.tokens)
-            return token
+            budget = self._budget.get(token)
+            if budget is not None:
+                self._budget[token] = (budget[0] - points,) + budget[1:]
+    
+    def earliest_reset(self):
+        """Reset time of the token whose budget frees up first, ignoring past resets"""
+        now = time.time()
+        with self.lock:
+            pending = [budget for budget in self._budget.values() if budget[2] > now]
+        return min(pending, key=lambda budget: budget[2])[1] if pending else None
 
 class ThreadSafeCounter:
     def __init__(self, initial=0):
@@ -57,39 +104,124 @@ class ThreadSafeCounter:
         with self.lock:
             self.value = value
 
+class RateLimitTracker:
+    def __init__(self, fetch, token_manager, check_interval=10):
+        """
+        Polls each token's rate limit with fetch(token) only every check_interval
+        requests made with it; token_manager keeps the budgets, estimated in between
+        """
+        self.fetch = fetch
+        self.token_manager = token_manager
+        self.check_interval = check_interval
+        self.cost = 1
+        self.requests_since_check = {}
+        self.lock = Lock()
+        
+    def get(self, token):
+        """Get the token's cached rate limit, refreshing it when due; None if the poll failed"""
+        with self.lock:
+            refresh = (
+                not self.token_manager.has_budget(token)
+                or self.requests_since_check.get(token, self.check_interval) >= self.check_interval
+            )
+            if refresh:
+                self.requests_since_check[token] = 0
+        if refresh:
+            rate_limit = self.fetch(token)
+            if rate_limit is None:
+                with self.lock:
+                    # Poll again on the next use instead of trusting a stale budget
+                    self.requests_since_check[token] = self.check_interval
+                return None
+            self.token_manager.update_budget(token, rate_limit['remaining'], rate_limit['resetAt'])
+            with self.lock:
+                # Every search query costs at least one point
+                self.cost = max(rate_limit['cost'], 1)
+        return {
+            'cost': self.cost,
+            'remaining': self.token_manager.get_remaining(token),
+            'resetAt': self.token_manager.get_reset_at(token)
+        }
+            
+    def record_request(self, token, num_queries=1):
+        """Account for one request running num_queries searches against the token's budget"""
+        with self.lock:
+            self.requests_since_check[token] = self.requests_since_check.get(token, 0) + 1
+            cost = self.cost
+        self.token_manager.spend(token, cost * num_queries)
+    
+    def expire(self):
+        """Re-poll every token on its next use, e.g. after waiting for a reset"""
+        with self.lock:
+            self.requests_since_check.clear()
+
 # Constants from Config
 GITHUB_API_URL = settings.github_api_url
 BATCH_SIZE = settings.batch_size
 
-# Initialize token manager with the GitHub token
-token_manager = TokenManager(settings.github_token)
+# Initialize token manager with the GitHub token(s)
+token_manager = TokenManager(settings.github_token_multi_thread or settings.github_token)
 
-def check_total_repos(shared_counters, target_total):
-    """Helper function to check if we've reached the target total"""
-    return shared_counters['total'].get() >= target_total
+# Shared HTTP session so every thread reuses pooled keep-alive TLS connections
+HTTP_POOL_SIZE = 32
+REQUEST_TIMEOUT = (5, 30)  # (connect, read) seconds
+http_session = requests.Session()
 
-def send_crawl_request(query, variables=None):
+def configure_http_pool(pool_size=HTTP_POOL_SIZE):
     """
-    Creates a GraphQL request with proper headers and authentication
+    Mounts a keep-alive connection pool large enough for pool_size concurrent
+    requests, so no thread has to open (and later discard) an extra connection
     """
-    token = token_manager.get_token()
-    print(f"Using API URL: {GITHUB_API_URL}")
-    print(f"Token (first 10 chars): {token[:10]}...")
-    
-    headers = {
+    # Release the connections pooled by the adapter being replaced
+    http_session.adapters['https://'].close()
+    http_session.mount('https://', HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=0
+    ))
+
+configure_http_pool()
+
+@lru_cache(maxsize=None)
+def get_request_headers(token):
+    """Build the request headers once per token"""
+    return {
         'Authorization': f'Bearer {token}',
         'Content-Type': 'application/json',
     }
+
+@lru_cache(maxsize=None)
+def encode_query(query):
+    """Serialize a (static) GraphQL query string once"""
+    return orjson.dumps(query)
+
+def send_crawl_request(query, variables=None, token=None):
+    """
+    Creates a GraphQL request with proper headers and authentication.
+    Uses the next token from token_manager unless a token is given.
+    """
+    if token is None:
+        token = token_manager.get_token()
+    headers = get_request_headers(token)
     
-    json_data = {
-        'query': query,
-        'variables': variables or {}
-    }
+    # Only the variables change between calls; the query bytes are cached
+    body = b'{"query":' + encode_query(query) + b',"variables":' + orjson.dumps(variables or {}) + b'}'
     
-    print("Request headers:", {k: '***' if k == 'Authorization' else v for k, v in headers.items()})
-    print("Request data:", json_data)
+    # Skip building the redacted debug output unless it will be emitted
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Using API URL: %s", GITHUB_API_URL)
+        logger.debug("Token (first 10 chars): %s...", token[:10])
+        logger.debug("Request headers: %s", {k: '***' if k == 'Authorization' else v for k, v in headers.items()})
+        logger.debug("Request data: %s", body)
     
-    return requests.post(GITHUB_API_URL, json=json_data, headers=headers)
+    return http_session.post(GITHUB_API_URL, data=body, headers=headers, timeout=REQUEST_TIMEOUT)
+
+SORT_MAPPING = {
+    "stars": "stars",
+    "updated": "updated",
+    "created": "created",
+    "forks": "forks"
+}
 
 def build_search_query(
     min_stars=0,
@@ -110,6 +242,19 @@ def build_search_query(
     - keywords: List of keywords to search in code/description
     - sort_by: How to sort results ("stars", "updated", "created", "forks")
     """
+    # Keywords must be hashable for the memoized builder
+    return _build_search_query(
+        min_stars,
+        language,
+        created_after,
+        created_before,
+        tuple(keywords) if keywords else None,
+        sort_by
+    )
+
+@lru_cache(maxsize=4096)
+def _build_search_query(min_stars, language, created_after, created_before, keywords, sort_by):
+    """Memoized implementation of build_search_query; pages of one date range reuse it"""
     # Start with base query
     query_parts = []
     
@@ -134,18 +279,89 @@ def build_search_query(
         query_parts.append(f"created:<{created_before}")
     
     # Add sort
-    sort_mapping = {
-        "stars": "stars",
-        "updated": "updated",
-        "created": "created",
-        "forks": "forks"
-    }
     if sort_by and sort_by.lower() != 'none':
-        sort_term = sort_mapping.get(sort_by, "stars")
+        sort_term = SORT_MAPPING.get(sort_by, "stars")
         query_parts.append(f"sort:{sort_term}")
     
     return " ".join(query_parts)
 
+# Only the fields db_write_batch consumes; the rate limit is polled separately
+SEARCH_RESULT_FRAGMENT = """
+fragment SearchResultFields on SearchResultItemConnection {
+    repositoryCount
+    pageInfo {
+        hasNextPage
+        endCursor
+    }
+    edges {
+        node {
+            ... on Repository {
+                id
+                nameWithOwner
+                stargazerCount
+                updatedAt
+            }
+        }
+    }
+}
+"""
+
+REPO_SEARCH_QUERY = """
+query($batch_size: Int!, $searchQuery: String!, $afterCursor: String) {
+    search(query: $searchQuery, type: REPOSITORY, first: $batch_size, after: $afterCursor) {
+        ...SearchResultFields
+    }
+}
+""" + SEARCH_RESULT_FRAGMENT
+
+# Upper bound on aliased searches sent in one batched request
+MAX_BATCHED_SEARCHES = 10
+
+@lru_cache(maxsize=None)
+def build_multi_search_query(count):
+    """
+    Builds a query running `count` first-page searches in one request,
+    aliased m0..m{count-1} and parameterized by $searchQuery_0.. variables
+    """
+    params = ", ".join(f"$searchQuery_{i}: String!" for i in range(count))
+    searches = "\n".join(
+        f"    m{i}: search(query: $searchQuery_{i}, type: REPOSITORY, first: $batch_size) {{\n"
+        f"        ...SearchResultFields\n"
+        f"    }}"
+        for i in range(count)
+    )
+    return f"query($batch_size: Int!, {params}) {{\n{searches}\n}}\n" + SEARCH_RESULT_FRAGMENT
+
+RATE_LIMIT_QUERY = """
+query {
+    rateLimit {
+        limit
+        cost
+        remaining
+        resetAt
+    }
+}
+"""
+
+def fetch_rate_limit(token=None):
+    """
+    Fetches the current GraphQL rate limit status of the token, or None on failure
+    """
+    response = send_crawl_request(RATE_LIMIT_QUERY, token=token)
+    if response.status_code != 200:
+        logger.error("Error: %s", response.status_code)
+        logger.error(response.text)
+        return None
+    data = orjson.loads(response.content)
+    if 'errors' in data:
+        logger.error("GraphQL Errors: %s", data['errors'])
+        return None
+    return data['data']['rateLimit']
+
+# Poll the rate limit every RATE_LIMIT_CHECK_INTERVAL queries instead of on each one
+RATE_LIMIT_CHECK_INTERVAL = 10
+rate_limit_tracker = RateLimitTracker(fetch_rate_limit, token_manager, RATE_LIMIT_CHECK_INTERVAL)
+
 def fetch_repositories(
     batch_size=5,
     min_stars=1,
@@ -168,90 +384,168 @@ def fetch_repositories(
         sort_by=sort_by
     )
     
-    query = """
-    query($batch_size: Int!, $searchQuery: String!, $afterCursor: String) {
-        rateLimit {
-            limit
-            cost
-            remaining
-            resetAt
-        }
-        search(query: $searchQuery, type: REPOSITORY, first: $batch_size, after: $afterCursor) {
-            repositoryCount
-            pageInfo {
-                hasNextPage
-                endCursor
-            }
-            edges {
-                cursor
-                node {
-                    ... on Repository {
-                        id
-                        nameWithOwner
-                        stargazerCount
-                        createdAt
-                        updatedAt
-                    }
-                }
-            }
-        }
-    }
-    """
-    
     variables = {
         'batch_size': batch_size,
         'searchQuery': search_query,
         'afterCursor': after_cursor
     }
     
-    response = send_crawl_request(query, variables)
+    acquired = acquire_token()
+    if acquired is None:
+        return None
+    token, rate_limit = acquired
+    response = send_crawl_request(REPO_SEARCH_QUERY, variables, token=token)
+    rate_limit_tracker.record_request(token)
     
     if response.status_code == 200:
-        data = response.json()
+        data = orjson.loads(response.content)
         if 'errors' in data:
-            print("GraphQL Errors:", data['errors'])
+            logger.error("GraphQL Errors: %s", data['errors'])
             return
             
-        # Check rate limit
-        print("*"*50 + "\nRate Limit Information\n" + "*"*50)
-        rate_limit = data['data']['rateLimit']
-        print("\nRate Limit Information:")
-        print(f"Remaining: {rate_limit['remaining']}/{rate_limit['limit']}")
-        print(f"Query Cost: {rate_limit['cost']}")
-        print(f"Reset At: {rate_limit['resetAt']}")
-        print("*"*50)
-        
-        # If we're close to rate limit, raise an exception
-        if rate_limit['remaining'] < rate_limit['cost'] * 2:  # Keep buffer for 2 queries
-            raise Exception(f"Rate limit nearly exceeded. Resets at {rate_limit['resetAt']}")
-            
-        search_data = data['data']['search']
-        print(f"\nSearch Query: {search_query}")
-        print(f"Total number of found repo: {search_data['repositoryCount']}")
-        
-        # Pagination information
-        page_info = search_data['pageInfo']
-        has_next_page = page_info['hasNextPage']
-        end_cursor = page_info['endCursor']
-        
-        print(f"Showing {batch_size} repositories:")
-        if has_next_page:
-            print(f"More results available. Use cursor: {end_cursor}")
-        return {
-            'repositories': [edge['node'] for edge in search_data['edges']],
-            'has_next_page': has_next_page,
-            'end_cursor': end_cursor,
-            'rate_limit': rate_limit
-        }
+        return parse_search_result(data['data']['search'], search_query, rate_limit)
     else:
-        print(f"Error: {response.status_code}")
-        print(response.text)
+        logger.error("Error: %s", response.status_code)
+        logger.error(response.text)
+        return None
+
+def fetch_repositories_multi(
+    partitions,
+    batch_size=5,
+    min_stars=1,
+    language=None,
+    keywords=None,
+    sort_by=None
+):
+    """
+    Fetches the first page of several date ranges with aliased searches, one
+    HTTP request per MAX_BATCHED_SEARCHES ranges.
+
+    Parameters:
+    - partitions: List of (created_after, created_before) tuples
+
+    Returns a list of fetch_repositories-style results aligned with partitions.
+    Once a request fails, it and the remaining ranges get None entries, while
+    pages from earlier requests are kept.
+    """
+    search_queries = [
+        build_search_query(
+            min_stars=min_stars,
+            language=language,
+            created_after=created_after,
+            created_before=created_before,
+            keywords=keywords,
+            sort_by=sort_by
+        )
+        for created_after, created_before in partitions
+    ]
+    
+    results = []
+    for start in range(0, len(search_queries), MAX_BATCHED_SEARCHES):
+        chunk_results = fetch_search_chunk(search_queries[start:start + MAX_BATCHED_SEARCHES], batch_size)
+        if chunk_results is None:
+            results.extend([None] * (len(search_queries) - start))
+            break
+        results.extend(chunk_results)
+    
+    return results
+
+def fetch_search_chunk(search_queries, batch_size):
+    """
+    Runs up to MAX_BATCHED_SEARCHES first-page searches in one aliased request.
+    Returns one result per search query, or None if the request fails.
+    """
+    variables = {'batch_size': batch_size}
+    for i, search_query in enumerate(search_queries):
+        variables[f'searchQuery_{i}'] = search_query
+    
+    acquired = acquire_token(num_queries=len(search_queries))
+    if acquired is None:
+        return None
+    token, rate_limit = acquired
+    response = send_crawl_request(build_multi_search_query(len(search_queries)), variables, token=token)
+    rate_limit_tracker.record_request(token, num_queries=len(search_queries))
+    
+    if response.status_code != 200:
+        logger.error("Error: %s", response.status_code)
+        logger.error(response.text)
         return None
+    
+    data = orjson.loads(response.content)
+    if 'errors' in data:
+        logger.error("GraphQL Errors: %s", data['errors'])
+        return None
+    
+    return [
+        parse_search_result(data['data'][f'm{i}'], search_query, rate_limit)
+        for i, search_query in enumerate(search_queries)
+    ]
+
+def acquire_token(num_queries=1):
+    """
+    Picks the token with the most (cached) budget for num_queries more queries.
+    Only when every token is nearly exhausted, waits for the earliest reset.
+    Returns (token, rate_limit), or None if the rate limit could not be polled.
+    """
+    while True:
+        token = token_manager.get_token()
+        rate_limit = rate_limit_tracker.get(token)
+        if rate_limit is None:
+            return None
+        logger.debug(
+            "Rate limit - Remaining: %s, Query Cost: %s, Reset At: %s",
+            rate_limit['remaining'], rate_limit['cost'], rate_limit['resetAt']
+        )
+        
+        needed = rate_limit['cost'] * (num_queries + 1)  # Keep buffer for 1 more query
+        if rate_limit['remaining'] >= needed:
+            return token, rate_limit
+        
+        # Polling may have shown the token to be low; try any other with budget left
+        if any(token_manager.get_remaining(other) >= needed for other in token_manager.tokens):
+            continue
+        reset_at = token_manager.earliest_reset()
+        if reset_at is not None:
+            wait_for_rate_limit_reset(reset_at)
+        rate_limit_tracker.expire()
+
+def parse_search_result(search_data, search_query, rate_limit):
+    """
+    Converts one GraphQL search connection into the fetch_repositories result
+    """
+    logger.debug("Search Query: %s", search_query)
+    logger.debug("Total number of found repo: %s", search_data['repositoryCount'])
+    
+    # Pagination information
+    page_info = search_data['pageInfo']
+    has_next_page = page_info['hasNextPage']
+    end_cursor = page_info['endCursor']
+    
+    logger.debug("Showing %s repositories", len(search_data['edges']))
+    if has_next_page:
+        logger.debug("More results available. Use cursor: %s", end_cursor)
+    return {
+        'repositories': [edge['node'] for edge in search_data['edges']],
+        'has_next_page': has_next_page,
+        'end_cursor': end_cursor,
+        'rate_limit': rate_limit
+    }
 
-def db_write_batch(repo_data_list: List[Dict[Any, Any]], max_retries: int = 1) -> bool:
+def parse_github_timestamp(value):
+    """
+    Parses a GitHub ISO-8601 timestamp such as "2024-03-20T10:00:00Z" into a
+    naive UTC datetime using the C-level fromisoformat fast path
+    """
+    if value.endswith('Z'):
+        value = value[:-1]
+    return datetime.fromisoformat(value)
+
+def db_write_batch(repo_data_list: List[Dict[Any, Any]], max_retries: int = 1, db=None) -> Optional[int]:
     """
     Write a batch of repository data to the database with retry mechanism.
     Only updates repositories if their star count has changed.
+    Returns the number of rows inserted or updated, or None if the write failed.
+    Uses the caller's long-lived session `db` if given, otherwise a new one.
     
     Expected format for each dictionary:
     {
@@ -262,75 +556,69 @@ def db_write_batch(repo_data_list: List[Dict[Any, Any]], max_retries: int = 1) -
     }
     """
     if not repo_data_list:
-        return True
+        return 0
+
+    current_time = datetime.utcnow()
 
     for retry_count in range(max_retries):
-        db = next(get_db())
-        try:
-            # Get all existing repositories with their current star counts
-            existing_repos = {
-                r.id: r for r in db.query(Repository).filter(
-                    Repository.id.in_([r["id"] for r in repo_data_list])
-                ).all()
-            }
-            
-            current_time = datetime.utcnow()
-            
-            # Prepare updates and inserts
-            to_update = []
-            to_insert = []
-            
-            for repo_data in repo_data_list:
-                repo = Repository(
-                    id=repo_data["id"],
-                    name=repo_data["nameWithOwner"],
-                    star_count=repo_data["stargazerCount"],
-                    updated_at=datetime.strptime(repo_data["updatedAt"], "%Y-%m-%dT%H:%M:%SZ"),
-                    last_crawled_at=current_time
-                )
+        # The caller's session stays open; a fallback session closes on exit
+        with (nullcontext(db) if db is not None else SessionLocal()) as session:
+            try:
+                stmt = build_repository_upsert(repo_data_list, current_time)
+                result = session.execute(stmt)
+                session.commit()
+                return result.rowcount
                 
-                if repo.id in existing_repos:
-                    # Only update if star count has changed
-                    existing_repo = existing_repos[repo.id]
-                    if existing_repo.star_count != repo.star_count:
-                        to_update.append(repo)
-                else:
-                    to_insert.append(repo)
-            
-            # Bulk insert new repositories
-            if to_insert:
-                db.bulk_save_objects(to_insert)
-            
-            # Bulk update repositories with changed star counts
-            if to_update:
-                for repo in to_update:
-                    db.merge(repo)
-            
-            db.commit()
-            return True
-            
-        except Exception as e:
-            print(f"Error in db_write_batch: {str(e)}")
-            db.rollback()
-            if retry_count == max_retries - 1:
-                return False
-        finally:
-            db.close()
+            except Exception as e:
+                logger.error("Error in db_write_batch: %s", e)
+                session.rollback()
+                if retry_count == max_retries - 1:
+                    return None
     
-    return False
+    return None
+
+def build_repository_upsert(repo_data_list: List[Dict[Any, Any]], current_time: datetime):
+    """
+    Build a single INSERT ... ON CONFLICT statement for a batch of repository
+    data; unchanged rows are no-ops server-side
+    """
+    # Keyed by id: ON CONFLICT cannot touch the same row twice in one statement
+    values = {
+        repo_data["id"]: {
+            "id": repo_data["id"],
+            "name": repo_data["nameWithOwner"],
+            "star_count": repo_data["stargazerCount"],
+            "updated_at": parse_github_timestamp(repo_data["updatedAt"]),
+            "last_crawled_at": current_time
+        }
+        for repo_data in repo_data_list
+    }
+
+    repositories = Repository.__table__
+    stmt = pg_insert(repositories).values(list(values.values()))
+    return stmt.on_conflict_do_update(
+        index_elements=[repositories.c.id],
+        set_={
+            "name": stmt.excluded.name,
+            "star_count": stmt.excluded.star_count,
+            "updated_at": stmt.excluded.updated_at,
+            "last_crawled_at": stmt.excluded.last_crawled_at
+        },
+        where=repositories.c.star_count.is_distinct_from(stmt.excluded.star_count)
+    )
 
 def wait_for_rate_limit_reset(reset_at):
     """
     Waits until the rate limit resets
     """
     # Convert reset_at string to datetime
-    reset_time = datetime.strptime(reset_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=pytz.UTC)
-    now = datetime.now(pytz.UTC)
+    reset_time = parse_github_timestamp(reset_at).replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
     
     # Calculate wait time
     wait_seconds = (reset_time - now).total_seconds()
     if wait_seconds > 0:
-        print(f"Rate limit reached. Waiting for {wait_seconds/60:.2f} minutes until {reset_at}")
+        logger.warning("Rate limit reached. Waiting for %.2f minutes until %s", wait_seconds / 60, reset_at)
         time.sleep(wait_seconds + 1)  # Add 1 second buffer
 
 def get_month_date_range(year, month):
@@ -343,15 +631,74 @@ def get_month_date_range(year, month):
     end_date = f"{year}-{month:02d}-{last_day:02d}"
     return start_date, end_date
 
-def get_next_date_range(year, month):
-    """Helper function to get the next date range"""
-    if month == 1:
-        return year - 1, 12
-    else:
-        return year, month - 1
+def get_next_date_range(year, month, stride=1):
+    """
+    Helper function to get the next date range, stepping `stride` months back.
+    Workers use stride=num_threads so their partitions never overlap.
+    """
+    year, month_index = divmod(year * 12 + (month - 1) - stride, 12)
+    return year, month_index + 1
+
+def db_writer(write_queue, shared_counters, max_retries=None):
+    """
+    Consumer thread that writes fetched batches to the database, so crawl
+    workers can start their next request while the previous batch commits
+    """
+    if max_retries is None:
+        max_retries = settings.max_retries
+
+    # Only this thread writes, so accumulate locally and publish once at exit
+    local_write_time = 0.0
+    local_write_ops = 0
+    local_rows_changed = 0
+
+    # One session for the writer's lifetime instead of a new one per batch
+    with SessionLocal() as db:
+        while True:
+            item = write_queue.get()
+            try:
+                if item is None:  # Sentinel: all crawl workers are done
+                    shared_counters['write_time'].increment(local_write_time)
+                    shared_counters['write_ops'].increment(local_write_ops)
+                    shared_counters['rows_changed'].increment(local_rows_changed)
+                    return
+
+                list_repo_data, thread_key = item
+                write_start_time = time.time()
+
+                try:
+                    rows_changed = db_write_batch(list_repo_data, max_retries=max_retries, db=db)
+                except Exception as e:
+                    # Dropping the batch beats losing the only writer, which would leave
+                    # the workers blocked on a full queue
+                    logger.error("Error writing batch from thread %s: %s", thread_key, e)
+                    rows_changed = None
+                if rows_changed is None:
+                    logger.error("Failed to write batch from thread %s to database, skipping this batch...", thread_key)
+                    continue
+
+                local_write_time += time.time() - write_start_time
+                local_write_ops += 1
+                local_rows_changed += rows_changed
+            finally:
+                write_queue.task_done()
+
+def crawl_worker(args, initial_year, initial_month, shared_counters, thread_key, write_queue, max_retries=None,
+                 initial_result=None):
+    """
+    Worker function for threaded crawling; fetched batches are handed to db_writer.
+    initial_result, if given, is the already fetched first page of the initial month.
+    """
+    # Timing stats are accumulated locally and flushed to the shared counters
+    # once per date range, keeping their locks off the per-batch path
+    local_stats = {'crawl_time': 0.0, 'crawl_ops': 0}
+
+    def flush_local_stats():
+        shared_counters['crawl_time'].increment(local_stats['crawl_time'])
+        shared_counters['crawl_ops'].increment(local_stats['crawl_ops'])
+        local_stats['crawl_time'] = 0.0
+        local_stats['crawl_ops'] = 0
 
-def crawl_worker(args, initial_year, initial_month, shared_counters, thread_key, max_retries=None):
-    """Worker function for threaded crawling"""
     try:
         if max_retries is None:
             max_retries = settings.max_retries
@@ -360,13 +707,13 @@ def crawl_worker(args, initial_year, initial_month, shared_counters, thread_key,
         month = initial_month
         target_total = args.total_num_repo if args.total_num_repo else settings.total_num_repo
         
-        while not check_total_repos(shared_counters, target_total):
+        while not shared_counters['done'].is_set():
             count_current_partition = 0
             after_cursor = None
             flag_no_more_page = False
             
             while not flag_no_more_page and count_current_partition < args.partition_threshold:
-                if check_total_repos(shared_counters, target_total):
+                if shared_counters['done'].is_set():
                     return
                     
                 created_after, created_before = get_month_date_range(year, month)
@@ -374,97 +721,121 @@ def crawl_worker(args, initial_year, initial_month, shared_counters, thread_key,
                 retry_count = 0
                 while retry_count < max_retries:
                     try:
-                        with shared_counters['print_lock']:
-                            print(f"Thread {thread_key} ({year}-{month:02d}) fetching from {created_after} to {created_before}")
-                            print(f"Progress: {shared_counters['total'].get()}/{target_total} repositories")
-                        
-                        crawl_start_time = time.time()
-                        
-                        crawl_result = fetch_repositories(
-                            batch_size=args.batch_size,
-                            min_stars=args.min_stars,
-                            language=args.language,
-                            keywords=[args.keywords] if args.keywords else None,
-                            sort_by=args.sort_by,
-                            created_after=created_after,
-                            created_before=created_before,
-                            after_cursor=after_cursor
+                        logger.debug(
+                            "Thread %s (%d-%02d) fetching from %s to %s",
+                            thread_key, year, month, created_after, created_before
                         )
                         
-                        crawl_time = time.time() - crawl_start_time
-                        shared_counters['crawl_time'].increment(crawl_time)
-                        shared_counters['crawl_ops'].increment()
+                        if initial_result is not None:
+                            # First page came from the pipeline's batched request
+                            crawl_result, initial_result = initial_result, None
+                            crawl_time = 0.0
+                        else:
+                            crawl_start_time = time.time()
+                            
+                            crawl_result = fetch_repositories(
+                                batch_size=args.batch_size,
+                                min_stars=args.min_stars,
+                                language=args.language,
+                                keywords=(args.keywords,) if args.keywords else None,
+                                sort_by=args.sort_by,
+                                created_after=created_after,
+                                created_before=created_before,
+                                after_cursor=after_cursor
+                            )
+                            
+                            crawl_time = time.time() - crawl_start_time
+                            local_stats['crawl_time'] += crawl_time
+                            local_stats['crawl_ops'] += 1
                         
                         if not crawl_result:
                             raise Exception("Failed to fetch repositories")
                         
                         list_repo_data = crawl_result['repositories']
-                        
-                        write_start_time = time.time()
-                        
-                        if not db_write_batch(list_repo_data, max_retries=max_retries):
-                            with shared_counters['print_lock']:
-                                print("Failed to write batch to database, skipping this batch...")
-                            continue
-                        
-                        write_time = time.time() - write_start_time
-                        shared_counters['write_time'].increment(write_time)
-                        shared_counters['write_ops'].increment()
-                        
                         num_fetched = len(list_repo_data)
                         
-                        # Update both counters
+                        # Update both counters before a possibly blocking put,
+                        # so other threads see the progress and stop in time
                         shared_counters['thread_counts'][thread_key].increment(num_fetched)
-                        shared_counters['total'].increment(num_fetched)
+                        if shared_counters['total'].increment(num_fetched) >= target_total:
+                            shared_counters['done'].set()
                         
-                        with shared_counters['print_lock']:
-                            print(f"Thread {thread_key} ({year}-{month:02d}) fetched and saved {num_fetched} repositories")
-                            print(f"Thread total: {shared_counters['thread_counts'][thread_key].get()}")
-                            print(f"Crawl time: {crawl_time:.2f}s, Write time: {write_time:.2f}s")
-                            
-                            if shared_counters['crawl_ops'].get() > 0 and shared_counters['write_ops'].get() > 0:
-                                avg_crawl = shared_counters['crawl_time'].get() / shared_counters['crawl_ops'].get()
-                                avg_write = shared_counters['write_time'].get() / shared_counters['write_ops'].get()
-                                print(f"Average times - Crawl: {avg_crawl:.2f}s, Write: {avg_write:.2f}s")
+                        # Blocks only when the writer falls behind by a full queue
+                        if list_repo_data:
+                            write_queue.put((list_repo_data, thread_key))
+                        
+                        # Single summary line per completed batch
+                        logger.info(
+                            "Thread %s (%d-%02d) fetched %d repositories "
+                            "(thread total: %d, progress: %d/%d, crawl: %.2fs)",
+                            thread_key, year, month, num_fetched,
+                            shared_counters['thread_counts'][thread_key].get(),
+                            shared_counters['total'].get(), target_total,
+                            crawl_time
+                        )
                         
                         count_current_partition += num_fetched
                         
                         if crawl_result['has_next_page']:
+                            # Back to the page loop to re-check the target and partition threshold
                             after_cursor = crawl_result['end_cursor']
+                            break
                         else:
-                            with shared_counters['print_lock']:
-                                print(f"No more repositories for {year}-{month:02d}")
+                            logger.info("No more repositories for %d-%02d", year, month)
                             flag_no_more_page = True
                             break
                             
                     except Exception as e:
                         error_msg = str(e)
-                        with shared_counters['print_lock']:
-                            print(f"API Error occurred in thread {thread_key} ({year}-{month:02d}): {error_msg}")
-                        
-                        if "Rate limit nearly exceeded" in error_msg:
-                            reset_at = error_msg.split("Resets at ")[-1]
-                            wait_for_rate_limit_reset(reset_at)
-                            continue
+                        logger.warning("API Error occurred in thread %s (%d-%02d): %s", thread_key, year, month, error_msg)
                         
                         retry_count += 1
                         if retry_count >= max_retries:
-                            with shared_counters['print_lock']:
-                                print(f"Max retries reached for thread {thread_key} ({year}-{month:02d}). Moving to next date range...")
+                            logger.warning(
+                                "Max retries reached for thread %s (%d-%02d). Moving to next date range...",
+                                thread_key, year, month
+                            )
                             flag_no_more_page = True
                             break
-                        with shared_counters['print_lock']:
-                            print(f"Retrying in 2 seconds... (Attempt {retry_count + 1}/{max_retries})")
-                        time.sleep(2)
+                        logger.info("Retrying in 2 seconds... (Attempt %d/%d)", retry_count + 1, max_retries)
+                        # Wake up early if another thread reaches the target meanwhile
+                        if shared_counters['done'].wait(2):
+                            return
             
-            # Move to next date range
-            year, month = get_next_date_range(year, month)
-            with shared_counters['print_lock']:
-                print(f"Thread {thread_key} moving to new date range: {year}-{month:02d}")
+            flush_local_stats()
+            
+            # Move to next date range, skipping the months other threads own
+            year, month = get_next_date_range(year, month, stride=args.num_threads)
+            logger.info("Thread %s moving to new date range: %d-%02d", thread_key, year, month)
                     
     except Exception as e:
-        with shared_counters['print_lock']:
-            print(f"Error in crawl_worker for thread {thread_key} ({year}-{month:02d}): {e}")
+        logger.error("Error in crawl_worker for thread %s (%d-%02d): %s", thread_key, year, month, e)
+    finally:
+        flush_local_stats()
+
+def fetch_initial_pages(args, date_ranges, shared_counters):
+    """
+    Fetches the first page of every thread's initial month in batched requests.
+    Returns one result per date range; None entries are fetched by the thread itself.
+    """
+    partitions = [get_month_date_range(year, month) for year, month in date_ranges]
+    try:
+        crawl_start_time = time.time()
+        results = fetch_repositories_multi(
+            partitions,
+            batch_size=args.batch_size,
+            min_stars=args.min_stars,
+            language=args.language,
+            keywords=(args.keywords,) if args.keywords else None,
+            sort_by=args.sort_by
+        )
+        if any(results):
+            shared_counters['crawl_time'].increment(time.time() - crawl_start_time)
+            shared_counters['crawl_ops'].increment()
+            return results
+    except Exception as e:
+        logger.warning("Batched first-page fetch failed, threads will fetch individually: %s", e)
+    return [None] * len(date_ranges)
 
 def crawl_pipeline(args, max_retries=None):
     try:
@@ -477,6 +848,10 @@ def crawl_pipeline(args, max_retries=None):
         print(f"Starting multi-threaded crawl with {num_threads} threads (using GitHub token)")
         print(f"Target total repositories: {target_total}")
 
+        # One pooled connection per worker thread
+        if num_threads > HTTP_POOL_SIZE:
+            configure_http_pool(num_threads)
+
         # Initialize shared counters
         shared_counters = {
             'total': ThreadSafeCounter(0),
@@ -484,8 +859,9 @@ def crawl_pipeline(args, max_retries=None):
             'write_time': ThreadSafeCounter(0),
             'crawl_ops': ThreadSafeCounter(0),
             'write_ops': ThreadSafeCounter(0),
-            'print_lock': Lock(),
-            'thread_counts': {}  # Track per-thread counts
+            'rows_changed': ThreadSafeCounter(0),  # Rows actually inserted or updated
+            'thread_counts': {},  # Track per-thread counts
+            'done': threading.Event()  # Set once the target total is reached
         }
 
         print("*"*80 + "\nGITHUB REPO Crawling...\n" + "*"*80)
@@ -508,27 +884,60 @@ def crawl_pipeline(args, max_retries=None):
         # Record start time for wall clock timing
         total_start_time = time.time()
         
-        # Create thread pool and start crawling
-        with ThreadPoolExecutor(max_workers=num_threads) as executor:
-            futures = []
-            for i, (year, month) in enumerate(date_ranges):
-                thread_key = f"thread_{i}"
-                shared_counters['thread_counts'][thread_key] = ThreadSafeCounter(0)
-                futures.append(
-                    executor.submit(
-                        crawl_worker,
-                        args,
-                        year,
-                        month,
-                        shared_counters,
-                        thread_key,
-                        max_retries
+        # Route worker log records through a queue drained by one listener thread,
+        # so threads never contend on the stream handlers' locks
+        root_logger = logging.getLogger()
+        original_handlers = root_logger.handlers[:]
+        log_queue = Queue(-1)
+        listener = QueueListener(log_queue, *original_handlers, respect_handler_level=True)
+        root_logger.handlers = [QueueHandler(log_queue)]
+        listener.start()
+        
+        # Single DB writer fed through a bounded queue, overlapping writes with fetches
+        write_queue = Queue(maxsize=num_threads * 2)
+        writer = threading.Thread(
+            target=db_writer,
+            args=(write_queue, shared_counters, max_retries),
+            name="db_writer",
+            daemon=True
+        )
+        writer.start()
+        
+        try:
+            initial_results = fetch_initial_pages(args, date_ranges, shared_counters)
+            
+            # Create thread pool and start crawling
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                futures = []
+                for i, (year, month) in enumerate(date_ranges):
+                    thread_key = f"thread_{i}"
+                    shared_counters['thread_counts'][thread_key] = ThreadSafeCounter(0)
+                    futures.append(
+                        executor.submit(
+                            crawl_worker,
+                            args,
+                            year,
+                            month,
+                            shared_counters,
+                            thread_key,
+                            write_queue,
+                            max_retries,
+                            initial_result=initial_results[i]
+                        )
                     )
-                )
+                
+                # Wait for all threads to complete
+                for future in futures:
+                    future.result()
+        finally:
+            # Let the writer drain the remaining batches, then stop it
+            write_queue.put(None)
+            write_queue.join()
+            writer.join()
             
-            # Wait for all threads to complete
-            for future in futures:
-                future.result()
+            # Flush queued log records before printing the final statistics
+            listener.stop()
+            root_logger.handlers = original_handlers
         
         # Calculate total wall clock time
         total_wall_time = time.time() - total_start_time
@@ -550,6 +959,7 @@ def crawl_pipeline(args, max_retries=None):
                 print(f"  {thread_key}: {counter.get()}")
         
         print(f"\nTotal repositories fetched: {total_from_threads}")
+        print(f"Rows inserted or updated: {shared_counters['rows_changed'].get()}")
         
         if shared_counters['crawl_ops'].get() > 0 and shared_counters['write_ops'].get() > 0:
             total_crawl_time = shared_counters['crawl_time'].get()
@@ -605,7 +1015,7 @@ def main():
             batch_size=args.batch_size,
             min_stars=args.min_stars,
             language=args.language,
-            keywords=[args.keywords] if args.keywords else None,
+            keywords=(args.keywords,) if args.keywords else None,
             sort_by=args.sort_by,
             created_after=args.created_after,
             created_before=args.created_before
@@ -2,8 +2,12 @@ import csv
 from datetime import datetime
 from typing import Dict
 import os
+from sqlalchemy import select
 from models import Repository, get_db
 
+# Rows fetched per round trip while dumping
+DUMP_CHUNK_SIZE = 1000
+
 def dump_to_csv(output_file: str = None) -> str:
     """Dump all repository data to a CSV file"""
     if output_file is None:
@@ -12,7 +16,11 @@ def dump_to_csv(output_file: str = None) -> str:
     
     db = next(get_db())
     try:
-        repos = db.query(Repository).all()
+        # Core rows streamed in chunks; no Repository objects or identity map
+        repos = db.execute(
+            select(Repository.__table__).execution_options(yield_per=DUMP_CHUNK_SIZE)
+        )
+        count = 0
         
         # Define CSV headers
         fieldnames = ['id', 'name', 'star_count', 'updated_at', 'last_crawled_at']
@@ -22,6 +30,7 @@ def dump_to_csv(output_file: str = None) -> str:
             writer.writeheader()
             
             for repo in repos:
+                count += 1
                 writer.writerow({
                     'id': repo.id,
                     'name': repo.name,
@@ -30,7 +39,7 @@ def dump_to_csv(output_file: str = None) -> str:
                     'last_crawled_at': repo.last_crawled_at.isoformat()
                 })
         
-        print(f"Successfully dumped {len(repos)} repositories to {output_file}")
+        print(f"Successfully dumped {count} repositories to {output_file}")
         return output_file
     finally:
         db.close()
@@ -43,6 +52,7 @@ def upload_from_csv(input_file: str) -> Dict[str, int]:
     db = next(get_db())
     try:
         stats = {"total": 0, "processed": 0, "failed": 0}
+        repos = {}  # Keyed by id so the last row wins, as with merge
         
         # Read and process CSV file
         with open(input_file, 'r', newline='', encoding='utf-8') as f:
@@ -50,23 +60,37 @@ def upload_from_csv(input_file: str) -> Dict[str, int]:
             for row in reader:
                 stats["total"] += 1
                 try:
-                    # Create repository object
-                    repo = Repository(
-                        id=row["id"],
-                        name=row["name"],
-                        star_count=int(row["star_count"]),
-                        updated_at=datetime.fromisoformat(row["updated_at"]),
-                        last_crawled_at=datetime.fromisoformat(row["last_crawled_at"])
-                    )
-                    
-                    # Merge will handle both insert and update
-                    db.merge(repo)
+                    repos[row["id"]] = {
+                        "id": row["id"],
+                        "name": row["name"],
+                        "star_count": int(row["star_count"]),
+                        "updated_at": datetime.fromisoformat(row["updated_at"]),
+                        "last_crawled_at": datetime.fromisoformat(row["last_crawled_at"])
+                    }
                     stats["processed"] += 1
                     
                 except Exception as e:
                     print(f"Error processing repository {row.get('id', 'unknown')}: {str(e)}")
                     stats["failed"] += 1
         
+        # Split into inserts and updates with one query instead of a merge per row
+        existing_ids = {
+            r.id for r in db.query(Repository.id).filter(Repository.id.in_(list(repos))).all()
+        }
+        to_insert = []
+        to_update = []
+        for repo_id, repo in repos.items():
+            if repo_id in existing_ids:
+                to_update.append(repo)
+            else:
+                to_insert.append(repo)
+        
+        # Plain mappings: no Repository objects are built for either path
+        if to_insert:
+            db.bulk_insert_mappings(Repository, to_insert)
+        if to_update:
+            db.bulk_update_mappings(Repository, to_update)
+        
         # Commit all changes
         db.commit()
         
@@ -10,11 +10,11 @@ Base = declarative_base()
 
 # Initialize database engine
 engine = create_engine(settings.database_url)
-Session = sessionmaker(bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
-    """Get a new database session"""
-    db = Session()
+    """Get a database session from the shared, engine-bound SessionLocal"""
+    db = SessionLocal()
     try:
         yield db
     finally:
@@ -30,16 +30,6 @@ def get_session_maker(engine=None):
         engine = get_engine()
     return sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db(fresh_settings=False):
-    """Get a database session"""
-    engine = get_engine()
-    SessionLocal = get_session_maker(engine)
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def create_tables():
     """Create all database tables"""
     engine = get_engine()
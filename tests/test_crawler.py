@@ -1,5 +1,22 @@
+import argparse
+import orjson
 import pytest
-from src.crawler import build_search_query, TokenManager
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from queue import Queue
+import threading
+from sqlalchemy.dialects import postgresql
+import src.crawler as crawler
+from src.crawler import (
+    build_multi_search_query, build_repository_upsert, build_search_query,
+    db_write_batch, db_writer, get_next_date_range, parse_github_timestamp,
+    RateLimitTracker, ThreadSafeCounter, TokenManager
+)
+
+def reset_in(minutes):
+    """GitHub-style resetAt timestamp `minutes` from now"""
+    reset = datetime.now(timezone.utc) + timedelta(minutes=minutes)
+    return reset.strftime("%Y-%m-%dT%H:%M:%SZ")
 
 def test_build_search_query():
     # Test basic query
@@ -24,6 +41,17 @@ def test_build_search_query():
     assert "machine learning" in query
     assert "AI" in query
     assert "stars:>=100" in query
+    
+    # Memoized: list and tuple keywords build the same query
+    assert build_search_query(min_stars=100, keywords=("machine learning", "AI")) is query
+
+def test_build_multi_search_query():
+    query = build_multi_search_query(3)
+    for i in range(3):
+        assert f"$searchQuery_{i}: String!" in query
+        assert f"m{i}: search(query: $searchQuery_{i}" in query
+    assert "m3:" not in query
+    assert "fragment SearchResultFields" in query
 
 def test_token_manager():
     # Test single token
@@ -38,4 +66,316 @@ def test_token_manager():
     assert tm.get_token() == "token1"
     assert tm.get_token() == "token2"
     assert tm.get_token() == "token3"
-    assert tm.get_token() == "token1"  # Back to first token 
\ No newline at end of file
+    assert tm.get_token() == "token1"  # Back to first token 
+
+def test_parse_github_timestamp():
+    assert parse_github_timestamp("2024-03-20T10:00:00Z") == datetime(2024, 3, 20, 10, 0, 0)
+    assert parse_github_timestamp("2024-03-20T10:00:00") == datetime(2024, 3, 20, 10, 0, 0)
+
+def test_token_manager_budget():
+    tm = TokenManager(["token1", "token2"])
+    first_reset = reset_in(30)
+    tm.update_budget("token1", 10, reset_in(60))
+    tm.update_budget("token2", 50, first_reset)
+    
+    # Most remaining budget wins regardless of rotation
+    assert tm.get_token() == "token2"
+    assert tm.get_token() == "token2"
+    
+    tm.spend("token2", 45)
+    assert tm.get_token() == "token1"
+    assert tm.earliest_reset() == first_reset
+
+def test_token_manager_budget_expires_at_reset():
+    tm = TokenManager(["token1", "token2"])
+    pending_reset = reset_in(30)
+    tm.update_budget("token1", 1, pending_reset)
+    tm.update_budget("token2", 0, reset_in(-5))
+    
+    # A budget whose reset has passed counts as fresh and is not waited on
+    assert tm.get_remaining("token2") == float("inf")
+    assert tm.get_token() == "token2"
+    assert tm.earliest_reset() == pending_reset
+
+def test_acquire_token_repolls_reset_token(monkeypatch):
+    tm = TokenManager(["token1", "token2"])
+    tm.update_budget("token1", 1, reset_in(30))
+    tm.update_budget("token2", 0, reset_in(-5))
+    
+    polls = []
+    def fetch(token):
+        polls.append(token)
+        return {"cost": 1, "remaining": 5000, "resetAt": reset_in(60)}
+    
+    def fail_wait(reset_at):
+        raise AssertionError(f"waited for {reset_at}")
+    
+    monkeypatch.setattr(crawler, "token_manager", tm)
+    monkeypatch.setattr(crawler, "rate_limit_tracker", RateLimitTracker(fetch, tm, check_interval=10))
+    monkeypatch.setattr(crawler, "wait_for_rate_limit_reset", fail_wait)
+    
+    token, rate_limit = crawler.acquire_token()
+    assert token == "token2"
+    assert rate_limit["remaining"] == 5000
+    assert polls == ["token2"]
+
+def test_rate_limit_tracker():
+    calls = []
+    def fetch(token):
+        calls.append(token)
+        return {"limit": 5000, "cost": 1, "remaining": 100, "resetAt": reset_in(60)}
+
+    tracker = RateLimitTracker(fetch, TokenManager(["token1", "token2"]), check_interval=3)
+    assert tracker.get("token1")["remaining"] == 100
+    
+    # Cached budget is estimated between polls
+    tracker.record_request("token1")
+    tracker.record_request("token1")
+    assert tracker.get("token1")["remaining"] == 98
+    assert calls == ["token1"]
+    
+    # Each token is polled separately
+    assert tracker.get("token2")["remaining"] == 100
+    assert calls == ["token1", "token2"]
+    
+    # Refreshed once check_interval requests were made
+    tracker.record_request("token1")
+    assert tracker.get("token1")["remaining"] == 100
+    assert calls == ["token1", "token2", "token1"]
+
+def test_get_next_date_range():
+    assert get_next_date_range(2024, 3) == (2024, 2)
+    assert get_next_date_range(2024, 1) == (2023, 12)
+    
+    # Stride skips the months owned by the other threads
+    assert get_next_date_range(2024, 3, stride=3) == (2023, 12)
+    assert get_next_date_range(2024, 2, stride=14) == (2022, 12)
+
+def test_db_writer_survives_failing_batch(monkeypatch):
+    written = []
+    def fake_write(repo_data_list, max_retries=1, db=None):
+        if repo_data_list[0]["updatedAt"] == "bad":
+            raise ValueError("bad timestamp")
+        written.extend(repo_data_list)
+        return len(repo_data_list)
+    
+    monkeypatch.setattr(crawler, "db_write_batch", fake_write)
+    monkeypatch.setattr(crawler, "SessionLocal", lambda: nullcontext(None))
+    
+    write_queue = Queue()
+    write_queue.put(([{"id": "1", "updatedAt": "bad"}], "thread_0"))
+    write_queue.put(([{"id": "2", "updatedAt": "2024-03-20T10:00:00Z"}], "thread_1"))
+    write_queue.put(None)
+    shared_counters = {
+        'write_time': ThreadSafeCounter(),
+        'write_ops': ThreadSafeCounter(),
+        'rows_changed': ThreadSafeCounter()
+    }
+    
+    # Returns on the sentinel instead of dying on the first batch
+    db_writer(write_queue, shared_counters, max_retries=1)
+    assert [row["id"] for row in written] == ["2"]
+    assert shared_counters['rows_changed'].get() == 1
+    assert shared_counters['write_ops'].get() == 1
+
+def test_build_repository_upsert():
+    crawled_at = datetime(2024, 3, 21)
+    stmt = build_repository_upsert([
+        {"id": "R1", "nameWithOwner": "o/a", "stargazerCount": 1, "updatedAt": "2024-03-20T10:00:00Z"},
+        {"id": "R2", "nameWithOwner": "o/b", "stargazerCount": 2, "updatedAt": "2024-03-20T10:00:00Z"},
+        {"id": "R1", "nameWithOwner": "o/a", "stargazerCount": 5, "updatedAt": "2024-03-20T11:00:00Z"},
+    ], crawled_at)
+    compiled = stmt.compile(dialect=postgresql.dialect())
+    sql = " ".join(str(compiled).split())
+    
+    assert "ON CONFLICT (id) DO UPDATE SET" in sql
+    assert "WHERE repositories.star_count IS DISTINCT FROM excluded.star_count" in sql
+    
+    # Duplicate ids collapse to the last row, in first-seen order
+    params = compiled.params
+    assert [params["id_m0"], params["id_m1"]] == ["R1", "R2"]
+    assert "id_m2" not in params
+    assert params["star_count_m0"] == 5
+    assert params["updated_at_m0"] == datetime(2024, 3, 20, 11, 0, 0)
+    assert params["last_crawled_at_m1"] == crawled_at
+
+class FakeSession:
+    def __init__(self, rowcount=0):
+        self.rowcount = rowcount
+        self.commits = 0
+        self.rollbacks = 0
+    
+    def execute(self, stmt):
+        return type("Result", (), {"rowcount": self.rowcount})()
+    
+    def commit(self):
+        self.commits += 1
+    
+    def rollback(self):
+        self.rollbacks += 1
+
+def test_db_write_batch_returns_rowcount():
+    session = FakeSession(rowcount=1)
+    rows = [{"id": "R1", "nameWithOwner": "o/a", "stargazerCount": 1, "updatedAt": "2024-03-20T10:00:00Z"}]
+    
+    assert db_write_batch(rows, db=session) == 1
+    assert session.commits == 1
+    assert db_write_batch([], db=session) == 0
+
+def test_db_write_batch_malformed_row():
+    session = FakeSession()
+    rows = [{"id": "R1", "nameWithOwner": "o/a", "stargazerCount": 1, "updatedAt": "bad"}]
+    
+    # Reported as a failed write instead of raising
+    assert db_write_batch(rows, max_retries=2, db=session) is None
+    assert session.commits == 0
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, text=""):
+        self.status_code = status_code
+        self.content = orjson.dumps(payload or {})
+        self.text = text
+
+def test_fetch_repositories_failed_rate_limit_poll(monkeypatch):
+    sent = []
+    def fake_send(query, variables=None, token=None):
+        sent.append(query)
+        return FakeResponse(401, text='{"message": "Bad credentials"}')
+    
+    tm = TokenManager("token1")
+    monkeypatch.setattr(crawler, "send_crawl_request", fake_send)
+    monkeypatch.setattr(crawler, "token_manager", tm)
+    monkeypatch.setattr(crawler, "rate_limit_tracker", RateLimitTracker(crawler.fetch_rate_limit, tm))
+    
+    # Reported like any other failed fetch; the search itself is never sent
+    assert crawler.fetch_repositories() is None
+    assert sent == [crawler.RATE_LIMIT_QUERY]
+    
+    # The next call polls again
+    assert crawler.fetch_repositories() is None
+    assert sent == [crawler.RATE_LIMIT_QUERY] * 2
+
+def search_payload(ids, has_next_page=False, end_cursor=None):
+    """GraphQL search connection holding repositories with the given ids"""
+    return {
+        "repositoryCount": len(ids),
+        "pageInfo": {"hasNextPage": has_next_page, "endCursor": end_cursor},
+        "edges": [
+            {"node": {"id": i, "nameWithOwner": f"o/{i}", "stargazerCount": 1, "updatedAt": "2024-03-20T10:00:00Z"}}
+            for i in ids
+        ]
+    }
+
+class StubTracker:
+    def record_request(self, token, num_queries=1):
+        pass
+
+def test_fetch_repositories_multi_keeps_pages_before_failed_chunk(monkeypatch):
+    requests_sent = []
+    def fake_send(query, variables=None, token=None):
+        requests_sent.append(variables)
+        if len(requests_sent) == 2:
+            return FakeResponse(502, text="Bad gateway")
+        return FakeResponse(payload={"data": {
+            "m0": search_payload(["R1"], has_next_page=True, end_cursor="c1"),
+            "m1": search_payload(["R2"]),
+        }})
+    
+    monkeypatch.setattr(crawler, "MAX_BATCHED_SEARCHES", 2)
+    monkeypatch.setattr(crawler, "send_crawl_request", fake_send)
+    monkeypatch.setattr(crawler, "acquire_token", lambda num_queries=1: ("token1", {"cost": 1}))
+    monkeypatch.setattr(crawler, "rate_limit_tracker", StubTracker())
+    
+    partitions = [("2024-03-01", "2024-03-31"), ("2024-02-01", "2024-02-29"), ("2024-01-01", "2024-01-31")]
+    results = crawler.fetch_repositories_multi(partitions)
+    
+    # Each alias maps back to its partition, and the failed chunk becomes None
+    assert [len(variables) for variables in requests_sent] == [3, 2]
+    assert "created:2024-01-01..2024-01-31" in requests_sent[1]["searchQuery_0"]
+    assert [repo["id"] for repo in results[0]["repositories"]] == ["R1"]
+    assert results[0]["has_next_page"] and results[0]["end_cursor"] == "c1"
+    assert [repo["id"] for repo in results[1]["repositories"]] == ["R2"]
+    assert results[2] is None
+
+def make_counters(thread_key):
+    return {
+        'total': ThreadSafeCounter(),
+        'crawl_time': ThreadSafeCounter(),
+        'crawl_ops': ThreadSafeCounter(),
+        'thread_counts': {thread_key: ThreadSafeCounter()},
+        'done': threading.Event()
+    }
+
+def make_args(**overrides):
+    args = dict(
+        num_threads=1, total_num_repo=10, partition_threshold=100, batch_size=5,
+        min_stars=1, language=None, keywords=None, sort_by=None
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def test_fetch_initial_pages_falls_back_on_error(monkeypatch):
+    def failing_multi(partitions, **kwargs):
+        raise RuntimeError("offline")
+    monkeypatch.setattr(crawler, "fetch_repositories_multi", failing_multi)
+    
+    counters = make_counters("thread_0")
+    assert crawler.fetch_initial_pages(make_args(), [(2024, 3), (2024, 2)], counters) == [None, None]
+    assert counters['crawl_ops'].get() == 0
+
+def test_crawl_worker_continues_from_prefetched_page(monkeypatch):
+    cursors = []
+    def fake_fetch(**kwargs):
+        cursors.append(kwargs["after_cursor"])
+        return crawler.parse_search_result(search_payload(["R6", "R7", "R8", "R9", "R10"]), "", {})
+    monkeypatch.setattr(crawler, "fetch_repositories", fake_fetch)
+    
+    initial = crawler.parse_search_result(
+        search_payload(["R1", "R2", "R3", "R4", "R5"], has_next_page=True, end_cursor="c1"), "", {}
+    )
+    write_queue = Queue()
+    counters = make_counters("thread_0")
+    crawler.crawl_worker(make_args(), 2024, 3, counters, "thread_0", write_queue,
+                         max_retries=1, initial_result=initial)
+    
+    # The prefetched page is used as is, and the next fetch follows its cursor
+    assert cursors == ["c1"]
+    batches = [write_queue.get_nowait()[0] for _ in range(write_queue.qsize())]
+    assert [repo["id"] for repo in batches[0]] == ["R1", "R2", "R3", "R4", "R5"]
+    assert counters['total'].get() == 10
+
+def test_crawl_worker_stops_at_partition_threshold_and_target(monkeypatch):
+    pages = []
+    def fake_fetch(**kwargs):
+        pages.append((kwargs["created_after"], kwargs["after_cursor"]))
+        cursor = int(kwargs["after_cursor"] or 0) + 1
+        ids = [f"{kwargs['created_after']}-{cursor}-{i}" for i in range(5)]
+        # Runs dry eventually, so a worker that ignores the limits still returns
+        has_next_page = len(pages) < 10
+        return crawler.parse_search_result(search_payload(ids, has_next_page, end_cursor=str(cursor)), "", {})
+    monkeypatch.setattr(crawler, "fetch_repositories", fake_fetch)
+    
+    counters = make_counters("thread_0")
+    crawler.crawl_worker(make_args(total_num_repo=25, partition_threshold=10), 2024, 3, counters,
+                         "thread_0", Queue(), max_retries=1)
+    
+    # Two pages per month hit the threshold; the fifth page reaches the target
+    assert pages == [
+        ("2024-03-01", None), ("2024-03-01", "1"),
+        ("2024-02-01", None), ("2024-02-01", "1"),
+        ("2024-01-01", None),
+    ]
+    assert counters['total'].get() == 25
+
+def test_configure_http_pool_closes_replaced_adapter(monkeypatch):
+    closed = []
+    old_adapter = crawler.http_session.adapters['https://']
+    monkeypatch.setattr(old_adapter, "close", lambda: closed.append(old_adapter))
+    
+    crawler.configure_http_pool(64)
+    new_adapter = crawler.http_session.adapters['https://']
+    assert closed == [old_adapter]
+    assert new_adapter is not old_adapter
+    assert new_adapter._pool_maxsize == 64
+    
+    crawler.configure_http_pool()